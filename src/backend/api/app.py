@@ -1,23 +1,30 @@
 from fastapi import FastAPI, WebSocket, HTTPException, Depends, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.requests import Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 import logging
-from typing import List, Optional, Dict, Set
+import asyncio
+from typing import List, Optional, Dict, Set, Tuple
 from pathlib import Path
-import json
+import orjson
 import time
-from datetime import datetime, timedelta
-import requests
-from weakref import WeakSet
+import hashlib
+import ssl
+from datetime import datetime
+import uuid
+import httpx
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from dataclasses import dataclass
 from urllib.parse import urlparse
+from websockets.exceptions import ConnectionClosed
 
 from ..config.settings import get_settings
-from ..core.agent import create_agent, create_initial_state
-from langchain_core.messages import HumanMessage, BaseMessage, ToolMessage
+from ..core.agent import create_agent, create_initial_state, create_summarizer, summarize_history, trim_history
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, ToolMessage
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -50,76 +57,260 @@ templates_path = Path(__file__).parent.parent.parent / "frontend" / "templates"
 app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
 templates = Jinja2Templates(directory=str(templates_path))
 
+# index.html has no per-request variables, so render it once and serve the cached page
+HOME_HTML = templates.get_template("index.html").render({"request": None})
+HOME_ETAG = f'"{hashlib.md5(HOME_HTML.encode("utf-8")).hexdigest()}"'
+HOME_HEADERS = {"ETag": HOME_ETAG, "Cache-Control": "public, max-age=300"}
+
 class RateLimiter:
+    """Token bucket limiter: each client refills at requests_per_minute / 60 tokens per second."""
     def __init__(self, requests_per_minute: int):
         self.requests_per_minute = requests_per_minute
-        self.requests: Dict[str, List[datetime]] = {}
+        self.refill_rate = requests_per_minute / 60.0
+        self.requests: Dict[str, Tuple[float, float]] = {}
     
     def is_rate_limited(self, client_id: str) -> bool:
-        now = datetime.now()
-        minute_ago = now - timedelta(minutes=1)
-        
-        if client_id in self.requests:
-            self.requests[client_id] = [
-                req_time for req_time in self.requests[client_id]
-                if req_time > minute_ago
-            ]
+        now = time.monotonic()
+        tokens, last_refill = self.requests.get(client_id, (self.requests_per_minute, now))
+        tokens = min(self.requests_per_minute, tokens + (now - last_refill) * self.refill_rate)
         
-        if client_id not in self.requests:
-            self.requests[client_id] = []
-        
-        if len(self.requests[client_id]) >= self.requests_per_minute:
+        if tokens < 1:
+            self.requests[client_id] = (tokens, now)
             return True
         
-        self.requests[client_id].append(now)
+        self.requests[client_id] = (tokens - 1, now)
         return False
 
+RATE_LIMIT_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+if redis.call('ZCARD', key) >= limit then
+    return 1
+end
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('PEXPIRE', key, window)
+return 0
+"""
+
+# an unreachable Redis must not hold up a message for the OS connect timeout
+REDIS_TIMEOUT = 0.5
+# after a failure, messages use the in-process limiter for this long before Redis is tried again
+REDIS_RETRY_AFTER = 30
+
+class RedisRateLimiter:
+    """Sliding window limiter shared by all workers, one sorted set per client in Redis."""
+    def __init__(self, redis_url: str, requests_per_minute: int, fallback: RateLimiter):
+        self.requests_per_minute = requests_per_minute
+        self.window_ms = 60_000
+        self.fallback = fallback
+        self.redis = aioredis.from_url(
+            redis_url,
+            socket_connect_timeout=REDIS_TIMEOUT,
+            socket_timeout=REDIS_TIMEOUT
+        )
+        self.script = self.redis.register_script(RATE_LIMIT_SCRIPT)
+        self.retry_at = 0.0
+    
+    async def load_script(self) -> None:
+        try:
+            await self.redis.script_load(RATE_LIMIT_SCRIPT)
+        except RedisError as e:
+            logger.warning(f"Redis unavailable, using in-process rate limiting: {e}")
+    
+    async def is_rate_limited(self, client_id: str) -> bool:
+        if time.monotonic() < self.retry_at:
+            return self.fallback.is_rate_limited(client_id)
+        now_ms = int(time.time() * 1000)
+        try:
+            limited = await self.script(
+                keys=[f"rate_limit:{client_id}"],
+                args=[now_ms, self.window_ms, self.requests_per_minute, f"{now_ms}-{uuid.uuid4().hex[:8]}"]
+            )
+            return bool(limited)
+        except RedisError as e:
+            logger.warning(f"Redis rate limit check failed, using in-process fallback for {REDIS_RETRY_AFTER}s: {e}")
+            self.retry_at = time.monotonic() + REDIS_RETRY_AFTER
+            return self.fallback.is_rate_limited(client_id)
+
 rate_limiter = RateLimiter(settings.max_requests_per_minute)
-active_connections: Set[WebSocket] = WeakSet()
+ssl_context = ssl.create_default_context()
+http_client = httpx.AsyncClient(
+    timeout=5.0,
+    limits=httpx.Limits(max_keepalive_connections=20),
+    verify=ssl_context
+)
+redis_rate_limiter = (
+    RedisRateLimiter(settings.redis_url, settings.max_requests_per_minute, rate_limiter)
+    if settings.redis_url else None
+)
+
+async def is_rate_limited(client_id: str) -> bool:
+    if redis_rate_limiter:
+        return await redis_rate_limiter.is_rate_limited(client_id)
+    return rate_limiter.is_rate_limited(client_id)
+
+@app.on_event("startup")
+async def startup() -> None:
+    if redis_rate_limiter:
+        await redis_rate_limiter.load_script()
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    await http_client.aclose()
+    if redis_rate_limiter:
+        await redis_rate_limiter.redis.aclose()
+
+def _timestamp() -> str:
+    """Wall clock time for error messages, formatted like the frontend's [HH:MM:SS] prefix."""
+    return time.strftime('%H:%M:%S')
+
+START_RESPONSE_FRAME = orjson.dumps({"type": "start_response"}).decode("utf-8")
+END_RESPONSE_FRAME = orjson.dumps({"type": "end_response"}).decode("utf-8")
+TOOL_END_FRAME = orjson.dumps({"type": "tool_end"}).decode("utf-8")
+
+@dataclass(eq=False)
+class Conn:
+    """An accepted websocket and whether it is still open."""
+    ws: WebSocket
+    alive: bool = True
+    
+    async def send_frame(self, frame: str) -> None:
+        """Send an already serialized JSON text frame.
+        
+        Marks the connection dead and raises WebSocketDisconnect if the client has gone away."""
+        try:
+            await self.ws.send_text(frame)
+        except (ConnectionClosed, RuntimeError, OSError) as e:
+            self.alive = False
+            raise WebSocketDisconnect(code=1006) from e
+    
+    async def send_json(self, payload: dict) -> None:
+        """Send a JSON text frame encoded with orjson instead of the stdlib encoder."""
+        await self.send_frame(orjson.dumps(payload).decode("utf-8"))
+
+active_connections: Set[Conn] = set()
+
+STREAM_BATCH_SIZE = 16
+STREAM_FLUSH_INTERVAL = 0.005
+
+class StreamBatcher:
+    """Coalesces streamed tokens into a single frame per batch instead of one frame per token.
+    
+    A partial batch is sent by a timer STREAM_FLUSH_INTERVAL after its first token, so a pause in the stream never holds text back."""
+    def __init__(self, conn: Conn):
+        self.conn = conn
+        self.pending: List[str] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.timed_flush: Optional[asyncio.Task] = None
+        # timed and explicit flushes take turns so frames go out in token order
+        self.lock = asyncio.Lock()
+    
+    async def add(self, content: str) -> None:
+        self.pending.append(content)
+        if len(self.pending) >= STREAM_BATCH_SIZE:
+            await self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(STREAM_FLUSH_INTERVAL, self._start_timed_flush)
+    
+    def _start_timed_flush(self) -> None:
+        self.timer = None
+        self.timed_flush = asyncio.create_task(self._flush_quietly())
+    
+    async def _flush_quietly(self) -> None:
+        try:
+            await self.flush()
+        except WebSocketDisconnect:
+            # the connection is already marked dead; the stream loop fails on its next send
+            pass
+    
+    async def flush(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        async with self.lock:
+            if not self.pending:
+                return
+            content = "".join(self.pending)
+            self.pending.clear()
+            await self.conn.send_json({
+                "type": "stream",
+                "content": content
+            })
 
 @app.get("/", response_class=HTMLResponse)
-async def get_home(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse("index.html", {"request": request})
+async def get_home(request: Request) -> Response:
+    if request.headers.get("if-none-match") == HOME_ETAG:
+        return Response(status_code=304, headers=HOME_HEADERS)
+    return HTMLResponse(HOME_HTML, headers=HOME_HEADERS)
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
-@app.get("/api/env")
-async def get_env():
-    settings = get_settings()
-    return {
-        "llm_base_url": settings.llm_base_url,
-        "llm_api_key": settings.llm_api_key
-    }
+MODELS_CACHE_TTL = 30
+models_cache: Tuple[float, List[Dict[str, str]]] = (0.0, [])
+models_lock = asyncio.Lock()
 
 @app.get("/api/models")
 async def get_models():
-    settings = get_settings()
-    try:
-        response = requests.get(
-            f"{settings.llm_base_url}/models",
-            headers={"Authorization": f"Bearer {settings.llm_api_key}"}
-        )
-        response.raise_for_status()
-        models_response = response.json()
+    global models_cache
+    expires, cached_models = models_cache
+    if cached_models and time.monotonic() < expires:
+        return cached_models
+    
+    async with models_lock:
+        expires, cached_models = models_cache
+        if cached_models and time.monotonic() < expires:
+            return cached_models
         
-        if isinstance(models_response, dict) and models_response.get('object') == 'list':
-            return [{"id": model["id"]} for model in models_response.get('data', [])]
+        settings = get_settings()
+        try:
+            response = await http_client.get(
+                f"{settings.llm_base_url}/models",
+                headers={"Authorization": f"Bearer {settings.llm_api_key}"}
+            )
+            response.raise_for_status()
+            models_response = response.json()
             
-        if isinstance(models_response, list):
-            return [{"id": model.get("id")} for model in models_response if model.get("id")]
+            models = []
+            if isinstance(models_response, dict) and models_response.get('object') == 'list':
+                models = [{"id": model["id"]} for model in models_response.get('data', [])]
+            elif isinstance(models_response, list):
+                models = [{"id": model.get("id")} for model in models_response if model.get("id")]
             
-        return []
-    except Exception as e:
-        logger.error(f"Failed to fetch models: {e}")
-        return []
+            models_cache = (time.monotonic() + MODELS_CACHE_TTL, models)
+            return models
+        except Exception as e:
+            logger.error(f"Failed to fetch models: {e}")
+            return []
+
+agent_cache: Dict[str, object] = {}
+agent_lock = asyncio.Lock()
+
+async def get_agent(model_name: str):
+    """Return the compiled agent graph for a model, building it once per process."""
+    graph = agent_cache.get(model_name)
+    if graph is not None:
+        return graph
+    
+    async with agent_lock:
+        if model_name not in agent_cache:
+            agent_cache[model_name] = create_agent(
+                llm_base_url=settings.llm_base_url,
+                llm_api_key=settings.llm_api_key,
+                model_name=model_name
+            )
+        return agent_cache[model_name]
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket) -> None:
+    conn = Conn(websocket)
     try:
         await websocket.accept()
-        active_connections.add(websocket)
+        active_connections.add(conn)
         
         client = websocket.client.host
         conversation_history: List[BaseMessage] = []
@@ -134,54 +325,54 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
         if not model_name or not any(m["id"] == model_name for m in models):
             model_name = models[0]["id"]
         
-        graph = create_agent(
-            llm_base_url=settings.llm_base_url,
-            llm_api_key=settings.llm_api_key,
-            model_name=model_name
-        )
+        graph = await get_agent(model_name)
+        summarizer = create_summarizer(settings.llm_base_url, settings.llm_api_key, model_name)
+        last_activity = time.monotonic()
         
-        while websocket in active_connections:
+        while conn.alive:
             try:
                 message = await websocket.receive_text()
                 
                 if not message or len(message.strip()) == 0:
                     continue
                     
-                if rate_limiter.is_rate_limited(client):
-                    if websocket in active_connections:
-                        await websocket.send_json({
-                            "type": "error",
-                            "content": f"\n[{datetime.now().strftime('%H:%M:%S')}] Rate limit exceeded. Please wait a moment."
-                        })
+                if await is_rate_limited(client):
+                    await conn.send_json({
+                        "type": "error",
+                        "content": f"\n[{_timestamp()}] Rate limit exceeded. Please wait a moment."
+                    })
                     continue
                 
                 if len(message) > 1000:
-                    if websocket in active_connections:
-                        await websocket.send_json({
-                            "type": "error",
-                            "content": f"\n[{datetime.now().strftime('%H:%M:%S')}] Message too long. Keep under 1000 characters."
-                        })
+                    await conn.send_json({
+                        "type": "error",
+                        "content": f"\n[{_timestamp()}] Message too long. Keep under 1000 characters."
+                    })
                     continue
                 
+                if time.monotonic() - last_activity > settings.history_idle_timeout:
+                    conversation_history = []
+                last_activity = time.monotonic()
+                
                 conversation_history.append(HumanMessage(content=message))
-                if websocket in active_connections:
-                    await websocket.send_json({"type": "start_response"})
+                conversation_history = trim_history(
+                    conversation_history, settings.max_history_messages, settings.max_history_chars
+                )
+                await conn.send_frame(START_RESPONSE_FRAME)
                 
                 assistant_response = ""
                 is_first_chunk = True
+                batcher = StreamBatcher(conn)
                 inputs = create_initial_state(conversation_history, autonomous=True)
                 
                 try:
-                    for chunk in graph.stream(inputs, stream_mode=["messages", "updates"]):
-                        if websocket not in active_connections:
-                            break
-                            
+                    async for chunk in graph.astream(inputs, stream_mode=["messages", "updates"]):
                         stream_type, content = chunk
                         if stream_type == "messages":
                             message_chunk, metadata = content
                             if isinstance(message_chunk, ToolMessage):
                                 tool_name = message_chunk.name
-                                tool_args = json.loads(message_chunk.content)
+                                tool_args = orjson.loads(message_chunk.content)
                                 desc = f"[NETGRID] >> Initializing {tool_name} protocol..."
                                 
                                 if tool_name == "web_search" and "query" in tool_args:
@@ -191,13 +382,13 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
                                     domain = urlparse(tool_args["url"]).netloc
                                     desc = f"[NETGRID] >> Establishing neural link with {domain}..."
                                 
-                                if websocket in active_connections:
-                                    await websocket.send_json({
-                                        "type": "tool_start",
-                                        "tool_name": tool_name,
-                                        "args": tool_args,
-                                        "description": desc
-                                    })
+                                await batcher.flush()
+                                await conn.send_json({
+                                    "type": "tool_start",
+                                    "tool_name": tool_name,
+                                    "args": tool_args,
+                                    "description": desc
+                                })
                                 is_first_chunk = True
                             elif message_chunk.content:
                                 chunk_content = message_chunk.content
@@ -205,42 +396,53 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
                                     chunk_content = f"\n\n{chunk_content}"
                                 is_first_chunk = False
                                 
-                                if websocket in active_connections:
-                                    await websocket.send_json({
-                                        "type": "stream",
-                                        "content": chunk_content
-                                    })
+                                await batcher.add(chunk_content)
                                 assistant_response += chunk_content
                         elif stream_type == "updates" and "agent" in content:
-                            if websocket in active_connections:
-                                await websocket.send_json({"type": "tool_end"})
+                            await batcher.flush()
+                            await conn.send_frame(TOOL_END_FRAME)
+                    
+                    await batcher.flush()
+                    await conn.send_frame(END_RESPONSE_FRAME)
+                    if assistant_response:
+                        conversation_history.append(AIMessage(content=assistant_response))
                     
-                    if websocket in active_connections:
-                        await websocket.send_json({"type": "end_response"})
-                        if assistant_response:
-                            conversation_history.append(HumanMessage(content=assistant_response))
+                    if len(conversation_history) > 2 * settings.history_keep_messages:
+                        try:
+                            conversation_history = await summarize_history(
+                                conversation_history, summarizer, settings.history_keep_messages
+                            )
+                        except Exception as e:
+                            logger.error(f"History summarization failed: {e}")
+                    conversation_history = trim_history(
+                        conversation_history, settings.max_history_messages, settings.max_history_chars
+                    )
+                except WebSocketDisconnect:
+                    raise
                 except Exception as e:
                     logger.error(f"Stream error: {e}")
-                    if websocket in active_connections:
-                        await websocket.send_json({
-                            "type": "error",
-                            "content": f"\n[{datetime.now().strftime('%H:%M:%S')}] An error occurred during processing."
-                        })
+                    await conn.send_json({
+                        "type": "error",
+                        "content": f"\n[{_timestamp()}] An error occurred during processing."
+                    })
                         
             except WebSocketDisconnect:
-                break
+                conn.alive = False
             except Exception as e:
                 logger.error(f"Message handling error: {e}")
-                if websocket in active_connections:
-                    await websocket.send_json({
+                try:
+                    await conn.send_json({
                         "type": "error",
-                        "content": f"\n[{datetime.now().strftime('%H:%M:%S')}] An error occurred. Please try again."
+                        "content": f"\n[{_timestamp()}] An error occurred. Please try again."
                     })
+                except WebSocketDisconnect:
+                    conn.alive = False
     
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
-        active_connections.discard(websocket)
+        conn.alive = False
+        active_connections.discard(conn)
         try:
             await websocket.close()
         except:
@@ -249,6 +451,7 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
 if __name__ == "__main__":
     import uvicorn
     import os
+    import sys
     import multiprocessing
     
     project_root = Path(__file__).parent.parent.parent.parent
@@ -262,6 +465,9 @@ if __name__ == "__main__":
         reload=settings.debug,
         log_level=settings.log_level.lower(),
         workers=workers,
+        loop=settings.event_loop or ("asyncio" if sys.platform == "win32" else "uvloop"),
+        http="httptools",
+        ws="websockets",
         ws_ping_interval=20,
         ws_ping_timeout=30,
         timeout_keep_alive=30
@@ -1,7 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import List
-import json
+from typing import List, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
@@ -27,13 +26,24 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8000
     debug: bool = False
+    event_loop: Optional[str] = None
     
     # Logging
     log_level: str = "INFO"
+    log_llm_requests: bool = True
+    log_llm_max_messages: int = 20
+    
+    # Conversation memory
+    history_keep_messages: int = 10
+    history_idle_timeout: int = 3600
+    max_history_messages: int = 100
+    max_history_chars: int = 200_000
+    max_context_tokens: int = 32000
     
     # Security
     cors_origins: List[str] = ["http://localhost:8000", "http://127.0.0.1:8000"]
     max_requests_per_minute: int = 60
+    redis_url: Optional[str] = None
     
     class Config:
         env_file = ".env"
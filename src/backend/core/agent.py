@@ -1,15 +1,26 @@
 import requests
-from bs4 import BeautifulSoup
-from typing import Annotated, Sequence, TypedDict
-from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import asyncio
+import aiohttp
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+from typing import Annotated, Optional, Sequence, Tuple, TypedDict
+from urllib.parse import urljoin
 from datetime import datetime
-from duckduckgo_search import DDGS
 from pathlib import Path
-import json
+from functools import lru_cache
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+import hashlib
+import codecs
+import os
+import tempfile
+import re
 import logging
 import uuid
-import os
 import time
+import threading
 from tenacity import retry, stop_after_attempt, wait_exponential
 from tavily import TavilyClient
 from ..config.settings import get_settings
@@ -21,11 +32,17 @@ LOGS_DIR = Path("logs/llm_requests")
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
 settings = get_settings()
-tavily_client = TavilyClient(api_key=settings.tavily_api_key)
+# created on the first search so importing the agent doesn't build an HTTP client that may never be used
+tavily_client = None
+tavily_lock = threading.Lock()
+
+# cache and log files are written off the request path; cached pages are pretty-printed only when debugging
+io_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="agent-io")
+JSON_DUMP_OPTION = orjson.OPT_INDENT_2 if settings.debug else 0
 
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage, HumanMessage, AIMessage
-from langchain_core.messages.utils import trim_messages
+from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage, HumanMessage, AIMessage, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
 from langchain_core.tools import tool
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
@@ -40,9 +57,17 @@ HEADERS = {
 class AgentState(TypedDict):
     """The state of the agent."""
     messages: Annotated[Sequence[BaseMessage], add_messages]
-    pending_urls: list[str] 
     autonomous_mode: bool
 
+def _get_tavily() -> TavilyClient:
+    """Return the shared Tavily client, creating it on first use."""
+    global tavily_client
+    if tavily_client is None:
+        with tavily_lock:
+            if tavily_client is None:
+                tavily_client = TavilyClient(api_key=settings.tavily_api_key)
+    return tavily_client
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -50,7 +75,7 @@ class AgentState(TypedDict):
 )
 def _try_tavily_search(query: str, max_results: int = 5) -> list:
     """Internal function to perform Tavily search with retries"""
-    results = tavily_client.search(query, max_results=max_results)
+    results = _get_tavily().search(query, max_results=max_results)
     if not results or not results.get('results'):
         return []
     return [{
@@ -59,23 +84,88 @@ def _try_tavily_search(query: str, max_results: int = 5) -> list:
         'link': r.get('url', '')
     } for r in results.get('results', [])]
 
+# shared DDGS client, created on first fallback so its session and token are reused across searches
+ddgs_client = None
+ddgs_lock = threading.Lock()
+
+def _get_ddgs():
+    """Return the shared DDGS client, creating it on first use."""
+    global ddgs_client
+    if ddgs_client is None:
+        with ddgs_lock:
+            if ddgs_client is None:
+                # only needed when Tavily fails, so keep it off the import path
+                from duckduckgo_search import DDGS
+                ddgs_client = DDGS(headers=HEADERS)
+    return ddgs_client
+
+DDG_RETRY_DELAY = 1.0
+
+def _is_rate_limit(error: Exception) -> bool:
+    """Whether a search failed because the service is throttling us."""
+    error_str = f"{type(error).__name__} {error}".lower()
+    return 'rate' in error_str or 'limit' in error_str or '429' in error_str
+
 def _fallback_ddg_search(query: str, max_results: int = 5) -> list:
     """Fallback to DDG search when Tavily fails"""
-    try:
-        with DDGS(headers=HEADERS) as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
+    global ddgs_client
+    for attempt in range(2):
+        try:
+            results = list(_get_ddgs().text(query, max_results=max_results))
             return [{
                 'title': r['title'],
                 'snippet': r['body'],
                 'link': r['link'] if 'link' in r else r.get('url', r.get('href', 'No URL found'))
             } for r in results]
-    except Exception as e:
-        logger.error(f"Fallback search failed: {str(e)}")
-        return []
+        except Exception as e:
+            logger.error(f"Fallback search failed: {str(e)}")
+            # retrying a rate limit only extends it
+            if attempt or _is_rate_limit(e):
+                break
+            # the session may be stale; retry once with a fresh client after a short pause
+            ddgs_client = None
+            time.sleep(DDG_RETRY_DELAY)
+    return []
+
+SEARCH_CACHE_TTL = 3600
+SEARCH_CACHE_SIZE = 1024
+# (normalized query, max_results) -> (expiry, results); the agent often repeats a query while planning
+search_cache: OrderedDict = OrderedDict()
+search_cache_lock = threading.Lock()
+
+def _search_cache_key(query: str, max_results: int) -> Tuple[str, int]:
+    """Cache key for a search; case and spacing differences hit the same entry."""
+    return ' '.join(query.lower().split()), max_results
+
+def _load_cached_search(key: Tuple[str, int]) -> Optional[list]:
+    """Return the cached results for a search if they are younger than SEARCH_CACHE_TTL."""
+    with search_cache_lock:
+        entry = search_cache.get(key)
+        if entry is None:
+            return None
+        expires, results = entry
+        if time.monotonic() >= expires:
+            del search_cache[key]
+            return None
+        search_cache.move_to_end(key)
+        return results
+
+def _save_search(key: Tuple[str, int], results: list) -> None:
+    """Cache successful search results, evicting the least recently used entry when full."""
+    with search_cache_lock:
+        search_cache[key] = (time.monotonic() + SEARCH_CACHE_TTL, results)
+        search_cache.move_to_end(key)
+        if len(search_cache) > SEARCH_CACHE_SIZE:
+            search_cache.popitem(last=False)
 
 @tool
 def web_search(query: str, max_results: int = 5) -> list:
     """Search the web for information about a topic. Returns a list of relevant results with titles, snippets, and links."""
+    cache_key = _search_cache_key(query, max_results)
+    cached = _load_cached_search(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         
         results = _try_tavily_search(query, max_results)
@@ -91,11 +181,11 @@ def web_search(query: str, max_results: int = 5) -> list:
                 'message': 'I was unable to find any search results. I will try something else.'
             }
             
+        _save_search(cache_key, results)
         return results
             
     except Exception as e:
-        error_str = str(e).lower()
-        if 'rate' in error_str or 'limit' in error_str or '429' in error_str:
+        if _is_rate_limit(e):
             return {
                 'error': 'Rate limit exceeded',
                 'message': 'I apologize, but I have hit a rate limit with the search service. I will try something else.'
@@ -105,134 +195,476 @@ def web_search(query: str, max_results: int = 5) -> list:
             'message': 'I encountered an error while searching. I will try something else.'
         }
 
-@tool
-def parse_website(url: str) -> dict:
-    """Use this tool to read the content of a website. Input must be a valid URL.
-    Returns a structured representation of the page optimized for LLM processing."""
+# single URL fetches reuse keep-alive connections across tool calls; batches go through aiohttp
+http_session = requests.Session()
+http_session.headers.update(HEADERS)
+http_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+)
+http_session.mount('http://', http_adapter)
+http_session.mount('https://', http_adapter)
+
+WEBSITE_DATA_DIR = Path("website_data")
+WEBSITE_DATA_DIR.mkdir(exist_ok=True)
+WEBSITE_CACHE_TTL = 3600
+
+MAX_PREFETCH_URLS = 3
+# a web_search waits at most this long for previews of its top results
+PREFETCH_DEADLINE = 3.0
+FETCH_CONCURRENCY = 16
+MAX_BATCH_URLS = 10
+FETCH_TIMEOUT = 10
+# unreachable hosts fail fast instead of holding a tool call for the full FETCH_TIMEOUT
+FETCH_CONNECT_TIMEOUT = 3.05
+MAX_BODY_BYTES = 2_000_000
+DEDUPE_PREFIX_LENGTH = 128
+MAX_SECTION_LENGTH = 8000
+MAX_ORPHANED_LENGTH = 10000
+MAX_LINKS = 50
+MAX_SUMMARY_LENGTH = 2000
+
+STRIP_TAGS = ('script', 'style', 'noscript', 'iframe')
+# page chrome outside any content element; never searched for content roots
+BOILERPLATE_TAGS = ('nav', 'footer', 'header')
+SECTION_TAGS = ('article', 'section', 'main')
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+SECTION_TEXT_TAGS = ('p', 'div', 'li', 'span', 'td')
+ORPHAN_TEXT_TAGS = ('p', 'div', 'td', 'li')
+SKIP_HREF_PREFIXES = ('javascript:', 'mailto:', 'tel:')
+ABSOLUTE_URL_PREFIXES = ('http://', 'https://')
+WHITESPACE_RE = re.compile(r'\s+')
+CHARSET_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.I)
+# the only tags parse_website reads; text outside the outermost of them is ignored
+CONTENT_TAGS = frozenset(['title', *SECTION_TAGS, *HEADING_TAGS, *SECTION_TEXT_TAGS, 'a'])
+SKIP_ROOT_TAGS = frozenset([*STRIP_TAGS, *BOILERPLATE_TAGS])
+STRIP_SELECTOR = ', '.join(STRIP_TAGS)
+SECTION_SELECTOR = ', '.join(SECTION_TAGS)
+HEADING_SELECTOR = ', '.join(HEADING_TAGS)
+SECTION_TEXT_SELECTOR = ', '.join(SECTION_TEXT_TAGS)
+ORPHAN_TEXT_SELECTOR = ', '.join(ORPHAN_TEXT_TAGS)
+
+def _clean_text(text: str) -> str:
+    """Clean and normalize text content."""
+    if not text:
+        return ''
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+@lru_cache(maxsize=4096)
+def _urljoin_cached(base: str, href: str) -> str:
+    """urljoin memoized on (base, href); relative links repeat heavily across pages of one site."""
+    return urljoin(base, href)
+
+def _iter_sentences(texts: list[str]):
+    """Yield the sentences of texts as if they were joined with spaces, without building the joined string."""
+    carry = ''
+    for text in texts:
+        # a text without a closing period continues into the next one
+        pieces = f"{carry} {text}".split('.') if carry else text.split('.')
+        carry = pieces.pop()
+        yield from pieces
+    yield carry
+
+def _build_summary(texts: list[str]) -> str:
+    """Join the page's sentences without their periods, stopping once MAX_SUMMARY_LENGTH is reached."""
+    parts = []
+    total_length = 0
+    for sentence in _iter_sentences(texts):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        parts.append(sentence)
+        total_length += len(sentence) + 1
+        if total_length >= MAX_SUMMARY_LENGTH:
+            break
+    return ' '.join(parts)[:MAX_SUMMARY_LENGTH]
+
+def _decode_html(html: bytes, encoding: Optional[str] = None) -> str:
+    """Decode a page body using the header charset, then a BOM, then a <meta> charset, then UTF-8 or windows-1252."""
+    candidates = [encoding]
+    if html.startswith(codecs.BOM_UTF8):
+        candidates.append('utf-8-sig')
+    elif html.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        candidates.append('utf-16')
+    match = META_CHARSET_RE.search(html, 0, max(2048, len(html) // 20))
+    if match:
+        candidates.append(match.group(1).decode('ascii'))
+    for name in candidates:
+        if not name:
+            continue
+        try:
+            # incremental so a multi-byte character cut off by MAX_BODY_BYTES is dropped, not mangled
+            return codecs.getincrementaldecoder(name)('replace').decode(html)
+        except LookupError:
+            continue
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        
-        for element in soup(['script', 'style', 'noscript', 'iframe']):
-            element.decompose()
-        
-        title = soup.title.string if soup.title else ''
-        
-        def clean_text(text: str) -> str:
-            """Clean and normalize text content."""
-            return ' '.join(text.split())
-        
-        content_sections = []
-        seen_content = set()  
+        return codecs.getincrementaldecoder('utf-8')().decode(html)
+    except UnicodeDecodeError:
+        return html.decode('windows-1252', errors='replace')
+
+def _content_roots(text: str) -> list[LexborNode]:
+    """Parse a page and return the outermost CONTENT_TAGS elements in document order, with STRIP_TAGS removed.
+    
+    Text outside those elements (loose body text, list and table wrappers) is ignored, and nothing under
+    a STRIP_TAGS or BOILERPLATE_TAGS element becomes a root."""
+    roots = []
+    stack = [LexborHTMLParser(text).root.iter()]
+    while stack:
+        for node in stack[-1]:
+            if node.tag in CONTENT_TAGS:
+                roots.append(node)
+            elif node.is_element_node and node.tag not in SKIP_ROOT_TAGS:
+                stack.append(node.iter())
+                break
+        else:
+            stack.pop()
+    for root in roots:
+        for node in root.css(STRIP_SELECTOR):
+            node.decompose()
+        # rejoin the text on either side of a removed script so words don't run together
+        root.merge_text_nodes()
+    return roots
+
+def _iter_tags(roots: list[LexborNode], selector: str):
+    """Yield every element under roots (roots included) matching selector, in document order."""
+    for root in roots:
+        yield from root.css(selector)
+
+def _iter_document(roots: list[LexborNode]):
+    """Yield (element, None) for each element and (None, text) for each text node under roots, in document order."""
+    for root in roots:
+        for node in root.traverse(include_text=True):
+            if node.is_text_node:
+                yield None, node.text_content
+            elif node.is_comment_node:
+                # comments count as text for link context
+                yield None, node.comment_content or ''
+            else:
+                yield node, None
+
+def _collect_link_contexts(roots: list[LexborNode], max_links: int) -> list[tuple]:
+    """Collect the first max_links followable anchors in one forward walk over the tree.
+    
+    Each entry is (anchor, two strings before it, two strings after its start tag), replacing
+    a find_all_previous/find_all_next tree walk per anchor."""
+    recent = deque(maxlen=2)
+    entries = []
+    waiting = []
+    for node, text in _iter_document(roots):
+        if node is None:
+            text = text.strip()
+            if not text:
+                continue
+            for entry in waiting:
+                entry[2].append(text)
+            waiting = [entry for entry in waiting if len(entry[2]) < 2]
+            recent.append(text)
+        elif node.tag == 'a' and len(entries) < max_links:
+            href = node.attributes.get('href')
+            # unfollowable links (javascript:, mailto:, tel:) must not use up the budget
+            if not href or href.startswith(SKIP_HREF_PREFIXES):
+                continue
+            entry = (node, list(recent), [])
+            entries.append(entry)
+            waiting.append(entry)
         
+        if len(entries) >= max_links and not waiting:
+            break
+    return entries
+
+def _parse_html(url: str, html: bytes, encoding: Optional[str] = None) -> dict:
+    """Turn raw HTML into a structured representation of the page optimized for LLM processing."""
+    roots = _content_roots(_decode_html(html, encoding))
+    
+    title_tag = next(_iter_tags(roots, 'title'), None)
+    title = _clean_text(title_tag.text()) if title_tag is not None else ''
+    
+    content_sections = []
+    # hashes of each kept text's first DEDUPE_PREFIX_LENGTH chars; nested elements that repeat
+    # their first child's text collapse onto the same key
+    seen_prefixes = set()
+    # every kept text in page order, so the summary can stream sentences without re-joining section bodies
+    all_text_parts = []
+    in_section = set()
+    
+    
+    for section in _iter_tags(roots, SECTION_SELECTOR):
+        section_content = []
+        section_title = ''
         
-        for section in soup.find_all(['article', 'section', 'main']):
-            section_content = []
-            section_title = ''
-            
-            
-            heading = section.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-            if heading:
-                section_title = clean_text(heading.get_text(strip=True))
-            
-            
-            for element in section.find_all(['p', 'div', 'li', 'span', 'td']):
-                text = clean_text(element.get_text(strip=True))
-                if text and text not in seen_content and len(text) > 5: 
-                    section_content.append(text)
-                    seen_content.add(text)
-            
-            if section_content:
-                content_sections.append({
-                    'heading': section_title,
-                    'content': ' '.join(section_content[:5000])  
-                })
         
+        heading = section.css_first(HEADING_SELECTOR)
+        if heading is not None:
+            section_title = _clean_text(heading.text(strip=True))
         
-        orphaned_content = []
-        total_length = 0
-        MAX_ORPHANED_LENGTH = 10000  
         
-        for element in soup.find_all(['p', 'div', 'td', 'li']):
-            if not element.find_parents(['article', 'section', 'main']):
-                text = clean_text(element.get_text(strip=True))
-                if text and text not in seen_content and len(text) > 5:
-                    orphaned_content.append(text)
-                    seen_content.add(text)
-                    total_length += len(text)
-                    if total_length > MAX_ORPHANED_LENGTH:
-                        break
+        elements = section.css(SECTION_TEXT_SELECTOR)
+        section_length = 0
+        for index, element in enumerate(elements):
+            # nested sections (article > section) revisit their elements; their text was already judged
+            if element in in_section:
+                continue
+            in_section.add(element)
+            text = _clean_text(element.text(strip=True))
+            if text and len(text) > 5 and hash(text[:DEDUPE_PREFIX_LENGTH]) not in seen_prefixes:
+                seen_prefixes.add(hash(text[:DEDUPE_PREFIX_LENGTH]))
+                # cut an oversized element to what is left of the budget; the +1 is the joining space
+                section_content.append(text[:MAX_SECTION_LENGTH - section_length])
+                section_length += len(text) + 1
+                if section_length >= MAX_SECTION_LENGTH:
+                    # the rest is still this section's text, so keep it out of the orphaned content
+                    in_section.update(elements[index + 1:])
+                    break
         
-        if orphaned_content:
+        if section_content:
             content_sections.append({
-                'heading': 'Additional Content',
-                'content': ' '.join(orphaned_content)
+                'heading': section_title,
+                'content': ' '.join(section_content)
             })
+            all_text_parts.extend(section_content)
+    
+    
+    orphaned_content = []
+    total_length = 0
+    
+    for element in _iter_tags(roots, ORPHAN_TEXT_SELECTOR):
+        if element not in in_section:
+            text = _clean_text(element.text(strip=True))
+            if text and len(text) > 5 and hash(text[:DEDUPE_PREFIX_LENGTH]) not in seen_prefixes:
+                seen_prefixes.add(hash(text[:DEDUPE_PREFIX_LENGTH]))
+                orphaned_content.append(text[:MAX_ORPHANED_LENGTH - total_length])
+                total_length += len(text) + 1
+                if total_length >= MAX_ORPHANED_LENGTH:
+                    break
+    
+    if orphaned_content:
+        content_sections.append({
+            'heading': 'Additional Content',
+            'content': ' '.join(orphaned_content)
+        })
+        all_text_parts.extend(orphaned_content)
+    
+    links = []
+    for link, before, after in _collect_link_contexts(roots, MAX_LINKS):
+        href = link.attributes['href']
+        if not href.startswith(ABSOLUTE_URL_PREFIXES):
+            href = _urljoin_cached(url, href)
         
-        links = []
-        MAX_LINKS = 50  
-        for link in soup.find_all('a', href=True)[:MAX_LINKS]:
-            href = link.get('href')
-            if not href or href.startswith(('javascript:', 'mailto:', 'tel:')):
-                continue
-                
-            if not href.startswith(('http://', 'https://')):
-                href = requests.compat.urljoin(url, href)
-            
-            link_text = clean_text(link.get_text(strip=True))
-            if not link_text:
-                continue
-                
-            context = clean_text(' '.join(
-                s.strip() for s in link.find_all_previous(string=True, limit=3)[-2:] +
-                [link_text] +
-                link.find_all_next(string=True, limit=3)[:2]
-            ))
+        link_text = _clean_text(link.text(strip=True))
+        if not link_text:
+            continue
             
-            if context:
-                links.append({
-                    'url': href,
-                    'text': link_text,
-                    'context': context[:3000], 
-                    'title': link.get('title', '')[:200]
-                })
-        
-        MAX_SUMMARY_LENGTH = 2000  
-        all_text = ' '.join(section['content'] for section in content_sections)
-        summary = ' '.join(
-            sent.strip() for sent in all_text.split('.')
-            if len(sent.strip()) > 0 
-        )[:MAX_SUMMARY_LENGTH]
-        
-        res = {
-            'url': url,
-            'title': title[:300],
-            'summary': summary,
-            'content': content_sections,
-            'links': links
-        }
-        
-        output_dir = Path("website_data")
-        output_dir.mkdir(exist_ok=True)
-        
-        safe_filename = "".join(c if c.isalnum() else "_" for c in url)
-        safe_filename = safe_filename[:100] + ".json" 
-        output_path = output_dir / safe_filename
-        
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(res, f, ensure_ascii=False, indent=2)
+        context = _clean_text(' '.join(before + [link_text] + after))
         
+        if context:
+            links.append({
+                'url': href,
+                'text': link_text,
+                'context': context[:3000], 
+                'title': (link.attributes.get('title') or '')[:200]
+            })
+    
+    summary = _build_summary(all_text_parts)
+    
+    res = {
+        'url': url,
+        'title': title[:300],
+        'summary': summary,
+        'content': content_sections,
+        'links': links
+    }
+    return res
+
+def _cache_path(url: str) -> Path:
+    """Location of a URL's parsed page under website_data/, keyed by a hash of the full URL."""
+    return WEBSITE_DATA_DIR / f"{hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest()}.json"
+
+def _load_cached_page(url: str) -> Optional[dict]:
+    """Return the parsed page for a URL if it was saved less than WEBSITE_CACHE_TTL seconds ago."""
+    path = _cache_path(url)
+    try:
+        if time.time() - path.stat().st_mtime < WEBSITE_CACHE_TTL:
+            return orjson.loads(path.read_bytes())
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _revalidation_state(url: str) -> Tuple[Optional[dict], dict]:
+    """The stale cached page for a URL and the conditional request headers built from its saved validators.
+    
+    A cached page that no longer loads is dropped with its .meta, so the request goes out unconditionally
+    instead of getting a 304 for a page that cannot be served."""
+    path = _cache_path(url)
+    meta_path = path.with_suffix('.meta')
+    try:
+        validators = orjson.loads(meta_path.read_bytes())
+    except (OSError, ValueError):
+        return None, {}
+    try:
+        page = orjson.loads(path.read_bytes())
+    except (OSError, ValueError):
+        logger.warning(f"[CACHE] Dropping unreadable cached page for {url}")
+        path.unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
+        return None, {}
+    headers = {}
+    if 'ETag' in validators:
+        headers['If-None-Match'] = validators['ETag']
+    if 'Last-Modified' in validators:
+        headers['If-Modified-Since'] = validators['Last-Modified']
+    return page, headers
+
+def _validators(headers) -> dict:
+    """The ETag/Last-Modified response headers worth keeping for a later conditional request."""
+    return {name: headers[name] for name in ('ETag', 'Last-Modified') if name in headers}
+
+def _refresh_cached_page(url: str, page: dict) -> dict:
+    """Serve the cached page loaded before the request after a 304 and restart its TTL."""
+    try:
+        _cache_path(url).touch()
+    except OSError:
+        pass
+    return page
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write data to a temp file beside path and rename it into place, so readers never see a partial file."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+def _write_cache_files(path: Path, page: bytes, validators: Optional[bytes]) -> None:
+    """Replace a cached page and its .meta, dropping the old .meta first so it never pairs with another page."""
+    meta_path = path.with_suffix('.meta')
+    meta_path.unlink(missing_ok=True)
+    _write_atomic(path, page)
+    if validators:
+        _write_atomic(meta_path, validators)
+
+def _save_website_data(url: str, res: dict, validators: Optional[dict] = None) -> None:
+    """Persist a parsed page under website_data/, which doubles as the parse cache.
+    
+    The response's validators go to a .meta sidecar so a stale page can be revalidated instead of refetched."""
+    io_executor.submit(
+        _write_cache_files,
+        _cache_path(url),
+        orjson.dumps(res, option=JSON_DUMP_OPTION),
+        orjson.dumps(validators) if validators else None
+    )
+
+def _check_content_type(content_type: str) -> Optional[str]:
+    """Reject responses that are clearly not HTML (PDFs, images, video) before reading the body.
+    
+    Returns the charset declared in the header, if any, so the parser can skip encoding detection."""
+    if content_type and 'html' not in content_type.lower():
+        raise ValueError(f"Unsupported content type: {content_type}")
+    match = CHARSET_RE.search(content_type)
+    return match.group(1) if match else None
+
+async def _fetch(session: aiohttp.ClientSession, url: str, headers: dict) -> Optional[Tuple[bytes, Optional[str], dict]]:
+    """Download at most MAX_BODY_BYTES of a raw page body along with its declared charset and validators.
+    
+    Returns None when a conditional request is answered with 304, i.e. the cached page is still current."""
+    async with session.get(url, headers=headers) as response:
+        if response.status == 304 and headers:
+            return None
+        response.raise_for_status()
+        encoding = _check_content_type(response.headers.get('Content-Type', ''))
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            body += chunk
+            if len(body) >= MAX_BODY_BYTES:
+                break
+        return bytes(body[:MAX_BODY_BYTES]), encoding, _validators(response.headers)
+
+def _parse_page(url: str, html: bytes, encoding: Optional[str] = None, validators: Optional[dict] = None) -> dict:
+    """Parse a downloaded page and persist it, returning an error dict on failure."""
+    try:
+        res = _parse_html(url, html, encoding)
+        _save_website_data(url, res, validators)
         return res
-        
     except Exception as e:
         return {
             'error': str(e),
             'url': url
         }
 
+async def _bounded_fetch(session: aiohttp.ClientSession, sem: asyncio.BoundedSemaphore, url: str) -> dict:
+    """Fetch and parse one URL while holding a slot of the concurrency semaphore."""
+    stale, headers = _revalidation_state(url)
+    async with sem:
+        try:
+            fetched = await _fetch(session, url, headers)
+        except Exception as e:
+            return {
+                'error': str(e),
+                'url': url
+            }
+    if fetched is None:
+        return _refresh_cached_page(url, stale)
+    # parse off the event loop so this page's parse overlaps the remaining downloads
+    return await asyncio.get_running_loop().run_in_executor(None, _parse_page, url, *fetched)
+
+async def parse_websites_batch(urls: list[str], deadline: Optional[float] = None) -> list[Optional[dict]]:
+    """Fetch and parse several URLs concurrently, returning results in input order.
+    
+    URLs with a fresh cached parse are served from disk and never fetched; stale ones are revalidated.
+    With a deadline in seconds, pages still loading when it passes are cancelled and come back as None."""
+    results = {url: _load_cached_page(url) for url in urls}
+    missing = [url for url, res in results.items() if res is None]
+    if missing:
+        sem = asyncio.BoundedSemaphore(FETCH_CONCURRENCY)
+        connector = aiohttp.TCPConnector(limit=FETCH_CONCURRENCY, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(
+            headers=HEADERS,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT)
+        ) as session:
+            tasks = [asyncio.ensure_future(_bounded_fetch(session, sem, url)) for url in missing]
+            done, pending = await asyncio.wait(tasks, timeout=deadline)
+            for task in pending:
+                task.cancel()
+            # let cancelled fetches unwind before the session closes
+            await asyncio.gather(*pending, return_exceptions=True)
+        results.update((url, task.result() if task in done else None) for url, task in zip(missing, tasks))
+    return [results[url] for url in urls]
+
+@tool
+def parse_website(url: str) -> dict:
+    """Use this tool to read the content of a website. Input must be a valid URL.
+    Returns a structured representation of the page optimized for LLM processing."""
+    cached = _load_cached_page(url)
+    if cached is not None:
+        return cached
+    
+    stale, headers = _revalidation_state(url)
+    try:
+        with http_session.get(url, timeout=(FETCH_CONNECT_TIMEOUT, FETCH_TIMEOUT), stream=True, headers=headers) as response:
+            if response.status_code == 304 and headers:
+                return _refresh_cached_page(url, stale)
+            response.raise_for_status()
+            encoding = _check_content_type(response.headers.get('Content-Type', ''))
+            html = response.raw.read(MAX_BODY_BYTES, decode_content=True)
+            validators = _validators(response.headers)
+    except Exception as e:
+        return {
+            'error': str(e),
+            'url': url
+        }
+    return _parse_page(url, html, encoding, validators)
+
+@tool
+def parse_websites(urls: list[str]) -> list[dict]:
+    """Use this tool to read several websites at once. Input must be a list of valid URLs.
+    Pages are fetched concurrently and returned in the same order as the input."""
+    return asyncio.run(parse_websites_batch(urls[:MAX_BATCH_URLS]))
+
 def create_initial_state(messages: list[BaseMessage], autonomous: bool = False) -> AgentState:
     """Create the initial state for the agent.
     
@@ -242,86 +674,29 @@ def create_initial_state(messages: list[BaseMessage], autonomous: bool = False)
     """
     return {
         "messages": messages,
-        "pending_urls": [],
         "autonomous_mode": autonomous
     }
 
-def create_agent(llm_base_url: str, llm_api_key: str, model_name: str = None):
-    """Create an agent with web search and parsing capabilities."""
-    if not model_name:
-        raise ValueError("Model name is required")
-        
-    logger.info(f"Using model: {model_name}")
-    
-    model = ChatOpenAI(
-        base_url=llm_base_url,
-        api_key=llm_api_key,
-        model=model_name,
-        streaming=True
-    )
-    
-    tools = [web_search, parse_website]
-    model = model.bind_tools(tools)
-    tools_by_name = {tool.name: tool for tool in tools}
-    
-    def tool_node(state: AgentState):
-        """Execute tool calls from the agent."""
-        logger.info("\n[NODE] Entering TOOLS node")
-        try:
-            if state["messages"][-1].tool_calls:
-                tool_calls = state["messages"][-1].tool_calls
-                if len(tool_calls) > 1:
-                    logger.warning(f"[SYSTEM ALERT] Multiple tool calls detected ({len(tool_calls)}). Executing primary protocol only.")
-                
-                tool_call = tool_calls[0]
-                logger.info(f"[EXECUTING] Protocol: {tool_call['name']} | Parameters: {tool_call['args']}")
-                
-                tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
-                logger.info(f"[DATA STREAM] Protocol output: {json.dumps(tool_result)[:500]}...") 
-                
-                
-                if isinstance(tool_result, dict) and 'error' in tool_result:
-                    error_message = AIMessage(content=tool_result.get('message', 'An error occurred. How would you like to proceed?'))
-                    return {
-                        "messages": [error_message],
-                        "pending_urls": state.get("pending_urls", []),
-                        "autonomous_mode": False
-                    }
-                
-                tool_message = ToolMessage(
-                    content=json.dumps(tool_result),
-                    name=tool_call["name"],
-                    tool_call_id=tool_call["id"],
-                )
-                logger.info(f"[DATA PACKET] Generated: {tool_message.content[:200]}...")
-                
-                return {
-                    "messages": [tool_message],
-                    "pending_urls": state.get("pending_urls", []),
-                    "autonomous_mode": state.get("autonomous_mode", False)
-                }
-        except Exception as e:
-            logger.error(f"[CRITICAL ERROR] Protocol execution failed: {str(e)}")
-            error_message = AIMessage(content=f"\n[{datetime.now().strftime('%H:%M:%S')}] An error occurred.  I will try something else.")
-            return {
-                "messages": [error_message],
-                "pending_urls": [],
-                "autonomous_mode": False
-            }
-            
-        return {
-            "messages": [],
-            "pending_urls": state.get("pending_urls", []),
-            "autonomous_mode": state.get("autonomous_mode", False)
-        }
-    
-    def call_model(state: AgentState):
-        system_prompt = SystemMessage("""⚠️ CRITICAL OPERATING PROTOCOLS ⚠️
+request_log_lock = threading.Lock()
+
+def _append_request_log(record: dict) -> None:
+    """Append one request/response record to today's JSONL file under logs/llm_requests/."""
+    line = orjson.dumps(record) + b"\n"
+    path = LOGS_DIR / f"llm_requests_{datetime.now():%Y-%m-%d}.jsonl"
+    with request_log_lock, open(path, "ab") as f:
+        f.write(line)
+
+# role names used in the LLM request logs
+ROLE_MAP = {SystemMessage: "system", AIMessage: "assistant", ToolMessage: "function", HumanMessage: "user"}
+
+SYSTEM_PROMPT = SystemMessage("""⚠️ CRITICAL OPERATING PROTOCOLS ⚠️
 
 1. MANDATORY WEBSITE PARSING:
 - You MUST use parse_website on EVERY URL you find in search results
 - NEVER make claims about a website's content without parsing it first
 - After web_search, ALWAYS parse the most relevant URLs before responding
+- Use parse_websites to read several URLs in one step instead of parsing them one by one
+- Search results with a 'page' preview were fetched already; use the preview to pick which URLs to parse in full
 - If you mention information from a URL, you MUST have parsed it first
 
 2. ANTI-HALLUCINATION PROTOCOL:
@@ -419,77 +794,204 @@ AUTONOMOUS MODE BEHAVIOR:
 
 Remember: Your primary purpose is to provide verifiable information with sources. If you can't provide a source URL, don't make the statement.
 When multiple facts come from the same source, try to combine them into single, well-structured sentences to avoid repetitive citations.
-"""
-        )
-                   
-        messages = [system_prompt] + state["messages"]
-        
-        
-        request_id = str(uuid.uuid4())
-        timestamp = datetime.now().isoformat()
+""")
+
+SUMMARY_PROMPT = """Summarize the conversation below for your own future reference.
+Keep every fact, source URL, open question and user preference that may matter later.
+Be concise and do not add anything that is not in the conversation."""
+
+@lru_cache()
+def create_summarizer(llm_base_url: str, llm_api_key: str, model_name: str) -> ChatOpenAI:
+    """Create a non-streaming chat model used to compress conversation history."""
+    return ChatOpenAI(
+        base_url=llm_base_url,
+        api_key=llm_api_key,
+        model=model_name
+    )
+
+async def summarize_history(messages: list[BaseMessage], summarizer: ChatOpenAI, keep: int) -> list[BaseMessage]:
+    """Collapse all but the last `keep` messages into a single summary message.
+    
+    Args:
+        messages: Conversation history, oldest first
+        summarizer: Chat model used to write the summary
+        keep: Number of most recent messages to keep verbatim
+    """
+    older, recent = messages[:-keep], messages[-keep:]
+    transcript = "\n\n".join(f"{type(msg).__name__}: {msg.content}" for msg in older)
+    summary = await summarizer.ainvoke([SystemMessage(SUMMARY_PROMPT), HumanMessage(transcript)])
+    logger.info(f"[MEMORY] Compressed {len(older)} messages into summary of {len(summary.content)} chars")
+    return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary.content}")] + recent
+
+def trim_history(messages: list[BaseMessage], max_messages: int, max_chars: int) -> list[BaseMessage]:
+    """Drop the oldest messages until history fits both budgets, always keeping the latest message.
+    
+    Args:
+        messages: Conversation history, oldest first
+        max_messages: Maximum number of messages to keep
+        max_chars: Maximum total content length to keep
+    """
+    start = max(0, len(messages) - max_messages)
+    total = sum(len(msg.content) for msg in messages[start:])
+    while total > max_chars and start < len(messages) - 1:
+        total -= len(messages[start].content)
+        start += 1
+    return messages[start:]
+
+def _latest_turn(messages: list[BaseMessage], max_tokens: int) -> list[BaseMessage]:
+    """Last human turn with tool outputs cut to share the token budget, for turns too large to trim whole."""
+    start = max((i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)), default=0)
+    turn = messages[start:]
+    # count_tokens_approximately assumes ~4 chars per token
+    budget = max_tokens * 4 // len(turn)
+    turn = [
+        ToolMessage(content=msg.content[:budget], name=msg.name, tool_call_id=msg.tool_call_id)
+        if isinstance(msg, ToolMessage) and isinstance(msg.content, str) and len(msg.content) > budget
+        else msg
+        for msg in turn
+    ]
+    if start > 0 and isinstance(messages[0], SystemMessage):
+        turn.insert(0, messages[0])
+    return turn
+
+def create_agent(llm_base_url: str, llm_api_key: str, model_name: str = None):
+    """Create an agent with web search and parsing capabilities."""
+    if not model_name:
+        raise ValueError("Model name is required")
         
+    logger.info(f"Using model: {model_name}")
+    
+    model = ChatOpenAI(
+        base_url=llm_base_url,
+        api_key=llm_api_key,
+        model=model_name,
+        streaming=True
+    )
+    
+    tools = [web_search, parse_website, parse_websites]
+    model = model.bind_tools(tools)
+    tools_by_name = {tool.name: tool for tool in tools}
+    
+    def tool_node(state: AgentState):
+        """Execute tool calls from the agent.
         
-        raw_messages = [
-            {
-                "role": "system" if isinstance(msg, SystemMessage)
-                        else "assistant" if isinstance(msg, AIMessage)
-                        else "function" if isinstance(msg, ToolMessage)
-                        else "user",
-                "content": msg.content,
-                **({"function_call": {"name": tc["name"], "arguments": tc["args"]} 
-                   for tc in msg.tool_calls} if hasattr(msg, "tool_calls") and msg.tool_calls else {}),
-                **({"name": msg.name} if isinstance(msg, ToolMessage) else {})
-            }
-            for msg in messages
-        ]
+        Returns only the state keys that change; messages go through the add_messages reducer."""
+        logger.info("\n[NODE] Entering TOOLS node")
+        try:
+            if state["messages"][-1].tool_calls:
+                tool_calls = state["messages"][-1].tool_calls
+                if len(tool_calls) > 1:
+                    logger.warning(f"[SYSTEM ALERT] Multiple tool calls detected ({len(tool_calls)}). Executing primary protocol only.")
+                
+                tool_call = tool_calls[0]
+                logger.info(f"[EXECUTING] Protocol: {tool_call['name']} | Parameters: {tool_call['args']}")
+                
+                tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
+                
+                if isinstance(tool_result, dict) and 'error' in tool_result:
+                    logger.info("[DATA STREAM] Protocol error: %s", tool_result)
+                    error_message = AIMessage(content=tool_result.get('message', 'An error occurred. How would you like to proceed?'))
+                    return {"messages": [error_message], "autonomous_mode": False}
+                
+                if tool_call["name"] == "web_search" and state.get("autonomous_mode") and isinstance(tool_result, list):
+                    urls = [
+                        r['link'] for r in tool_result
+                        if r.get('link', '').startswith(ABSOLUTE_URL_PREFIXES)
+                    ][:MAX_PREFETCH_URLS]
+                    if urls:
+                        logger.info(f"[AUTONOMOUS] Prefetching {len(urls)} top results concurrently")
+                        # only a preview goes into the search result; full pages stay in the cache for parse_website
+                        pages = asyncio.run(parse_websites_batch(urls, deadline=PREFETCH_DEADLINE))
+                        previews = {
+                            url: {key: page[key] for key in ('title', 'summary', 'error') if key in page}
+                            for url, page in zip(urls, pages) if page is not None
+                        }
+                        tool_result = [
+                            {**r, 'page': previews[r['link']]} if r.get('link') in previews else r
+                            for r in tool_result
+                        ]
+                
+                tool_message = ToolMessage(
+                    content=orjson.dumps(tool_result).decode('utf-8'),
+                    name=tool_call["name"],
+                    tool_call_id=tool_call["id"],
+                )
+                logger.info("[DATA STREAM] Protocol output: %s...", tool_message.content[:500])
+                
+                return {"messages": [tool_message]}
+        except Exception as e:
+            logger.error(f"[CRITICAL ERROR] Protocol execution failed: {str(e)}")
+            error_message = AIMessage(content=f"\n[{datetime.now().strftime('%H:%M:%S')}] An error occurred.  I will try something else.")
+            return {"messages": [error_message], "autonomous_mode": False}
+            
+        return {"messages": []}
+    
+    def call_model(state: AgentState):
+        # bound each call to the most recent turns that fit the context budget, keeping a leading summary
+        history = trim_messages(
+            state["messages"],
+            max_tokens=settings.max_context_tokens,
+            strategy="last",
+            token_counter=count_tokens_approximately,
+            include_system=True,
+            start_on="human",
+            allow_partial=False,
+        )
+        if not any(isinstance(msg, HumanMessage) for msg in history):
+            history = _latest_turn(state["messages"], settings.max_context_tokens)
+        messages = [SYSTEM_PROMPT, *history]
         
         
-        log_file = LOGS_DIR / f"llm_request_{timestamp}_{request_id[:8]}.json"
-        with open(log_file, "w", encoding="utf-8") as f:
-            json.dump({
-                "request_id": request_id,
-                "timestamp": timestamp,
-                "messages": raw_messages
-            }, f, ensure_ascii=False, indent=2)
+        timestamp = datetime.now().isoformat()
         
-        logger.info("[NEURAL INTERFACE] Incoming data streams:")
-        for msg in messages:
-            logger.info(f"- Type: {type(msg).__name__} | Payload: {msg.content[:200]}...")
+        # one preview line per message in the history; skip the loop entirely when INFO is off
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[NEURAL INTERFACE] Incoming data streams:")
+            for msg in messages:
+                logger.info("- Type: %s | Payload: %s...", type(msg).__name__, msg.content[:200])
         
         response = model.invoke(messages)
         
-        
-        raw_response = {
-            "role": "assistant",
-            "content": response.content
-        }
-        if hasattr(response, "tool_calls") and response.tool_calls:
-            raw_response["function_call"] = {
-                "name": response.tool_calls[0]["name"],
-                "arguments": response.tool_calls[0]["args"]
+        if settings.log_llm_requests:
+            # the log keeps a sliding window so each turn's record stays O(1) as the conversation grows
+            log_window = settings.log_llm_max_messages
+            raw_messages = []
+            for msg in (messages[-log_window:] if log_window > 0 else []):
+                entry = {"role": ROLE_MAP.get(type(msg), "user"), "content": msg.content}
+                tool_calls = getattr(msg, "tool_calls", None)
+                if tool_calls:
+                    entry["function_call"] = {"name": tool_calls[0]["name"], "arguments": tool_calls[0]["args"]}
+                if type(msg) is ToolMessage:
+                    entry["name"] = msg.name
+                raw_messages.append(entry)
+            
+            raw_response = {
+                "role": "assistant",
+                "content": response.content
             }
-        
-        
-        with open(log_file, "r", encoding="utf-8") as f:
-            log_data = json.load(f)
-        log_data["response"] = raw_response
-        with open(log_file, "w", encoding="utf-8") as f:
-            json.dump(log_data, f, ensure_ascii=False, indent=2)
+            if hasattr(response, "tool_calls") and response.tool_calls:
+                raw_response["function_call"] = {
+                    "name": response.tool_calls[0]["name"],
+                    "arguments": response.tool_calls[0]["args"]
+                }
+            
+            io_executor.submit(_append_request_log, {
+                "request_id": str(uuid.uuid4()),
+                "timestamp": timestamp,
+                "message_count": len(messages),
+                "messages": raw_messages,
+                "response": raw_response
+            })
         
         logger.info("[DATA STREAM] Neural interface response:")
-        logger.info(f"Payload: {response.content[:200]}...")
+        logger.info("Payload: %s...", response.content[:200])
         if response.tool_calls:
             logger.info(f"Protocol calls detected: {response.tool_calls}")
             if len(response.tool_calls) > 1:
                 response.tool_calls = [response.tool_calls[0]]
                 logger.warning("Multiple tool calls detected, only keeping the first one")
         
-        return {
-            "messages": [response],
-            "pending_urls": state.get("pending_urls", []),
-            "autonomous_mode": state.get("autonomous_mode", False),
-            "planner_state": state.get("planner_state", None)
-        }
+        return {"messages": [response]}
     
     def route_agent(state: AgentState):
         """Single decision point for routing agent actions."""